@@ -1,12 +1,16 @@
 """
 unittest for pytest
 """
+import builtins
 import io
 import os
 import platform
 import re
 import tempfile
 import time
+from unittest import mock
+
+import pytest
 
 from tfs.libs import chdir, open_inout, timetracer
 
@@ -31,6 +35,20 @@ def test_chdir():
     assert orig_dir == os.path.abspath(os.curdir)
 
 
+def test_chdir_not_exists():
+    # arrange
+    orig_dir = os.path.abspath('.')
+    dest_dir = os.path.join(tempfile.gettempdir(), 'test_chdir_not_exists')
+
+    # act
+    # assert
+    with pytest.raises(ValueError):
+        with chdir(dest_dir):
+            pass
+
+    assert orig_dir == os.path.abspath(os.curdir)
+
+
 def test_timetracer():
     # arrange
     file = io.StringIO()
@@ -44,8 +62,7 @@ def test_timetracer():
     result = str(file.read()).strip()
 
     assert result
-    r = re.match(r'[test] elapsed: .* seconds', result)
-    pass
+    assert re.match(r'\[test\] elapsed: [0-9]+\.[0-9]{9} seconds', result)
 
 
 def test_open_inout():
@@ -71,3 +88,34 @@ def test_open_inout():
             os.unlink(in_file)
         if os.path.exists(out_file):
             os.unlink(out_file)
+
+
+def test_open_inout_closes_input_on_output_error():
+    # arrange
+    in_file = './test_open_input.txt'
+    out_file = os.path.join(tempfile.gettempdir(), 'test_open_inout_not_exists', 'out.txt')
+
+    with open(in_file, 'w', encoding='utf-8') as fp:
+        fp.write('test')
+
+    opened = []
+    orig_open = builtins.open
+
+    def tracking_open(*args, **kwargs):
+        f = orig_open(*args, **kwargs)
+        opened.append(f)
+        return f
+
+    try:
+        # act
+        # assert
+        with mock.patch('builtins.open', tracking_open):
+            with pytest.raises(FileNotFoundError):
+                with open_inout(in_file, out_file):
+                    pass
+
+        assert len(opened) == 1
+        assert opened[0].closed
+    finally:
+        if os.path.exists(in_file):
+            os.unlink(in_file)
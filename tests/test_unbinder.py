@@ -0,0 +1,215 @@
+"""
+unittest for pytest
+"""
+import os
+import stat
+
+import pytest
+
+from tfs.unbinder import _rewrite_proj_one, _rewrite_sln_one, unbind
+
+SLN_HEADER = (b'\xef\xbb\xbf\r\n'
+              b'Microsoft Visual Studio Solution File, Format Version 12.00\r\n'
+              b'Global\r\n')
+SLN_VCS_SECTION = (b'\tGlobalSection(TeamFoundationVersionControl) = preSolution\r\n'
+                   b'\t\tSccNumberOfProjects = 2\r\n'
+                   b'\t\tSccLocalPath0 = .\r\n'
+                   b'\tEndGlobalSection\r\n')
+SLN_PROPERTIES_SECTION = (b'\tGlobalSection(SolutionProperties) = preSolution\r\n'
+                          b'\t\tHideSolutionNode = FALSE\r\n'
+                          b'\tEndGlobalSection\r\n')
+SLN_FOOTER = b'EndGlobal\r\n'
+
+PROJ_HEADER = (b'\xef\xbb\xbf<?xml version="1.0" encoding="utf-8"?>\r\n'
+               b'<Project ToolsVersion="14.0">\r\n'
+               b'  <PropertyGroup>\r\n'
+               b'    <AssemblyName>Test</AssemblyName>\r\n')
+PROJ_SCC_LINES = (b'    <SccProjectName>SAK</SccProjectName>\r\n'
+                  b'\t\t<SccLocalPath>SAK</SccLocalPath>\r\n'
+                  b'    <SccAuxPath>SAK</SccAuxPath>\r\n'
+                  b'<SccProvider>SAK</SccProvider>\r\n')
+PROJ_FOOTER = (b'  </PropertyGroup>\r\n'
+               b'</Project>')
+
+
+def test_rewrite_sln_one(tmp_path):
+    # arrange
+    sln_file = tmp_path / 'test.sln'
+    sln_file.write_bytes(SLN_HEADER + SLN_VCS_SECTION + SLN_PROPERTIES_SECTION + SLN_FOOTER)
+
+    # act
+    _rewrite_sln_one(str(sln_file))
+
+    # assert
+    assert sln_file.read_bytes() == SLN_HEADER + SLN_PROPERTIES_SECTION + SLN_FOOTER
+    assert [p.name for p in tmp_path.iterdir()] == ['test.sln']
+
+
+def test_rewrite_sln_one_two_sections(tmp_path):
+    # arrange
+    sln_file = tmp_path / 'test.sln'
+    sln_file.write_bytes(SLN_HEADER + SLN_VCS_SECTION + SLN_PROPERTIES_SECTION
+                         + SLN_VCS_SECTION + SLN_FOOTER)
+
+    # act
+    _rewrite_sln_one(str(sln_file))
+
+    # assert
+    assert sln_file.read_bytes() == SLN_HEADER + SLN_PROPERTIES_SECTION + SLN_FOOTER
+
+
+def test_rewrite_sln_one_unterminated_section(tmp_path):
+    # arrange
+    sln_file = tmp_path / 'test.sln'
+    sln_file.write_bytes(SLN_HEADER + SLN_PROPERTIES_SECTION
+                         + SLN_VCS_SECTION.replace(b'\tEndGlobalSection\r\n', b'') + SLN_FOOTER)
+
+    # act
+    _rewrite_sln_one(str(sln_file))
+
+    # assert
+    assert sln_file.read_bytes() == SLN_HEADER + SLN_PROPERTIES_SECTION
+
+
+def test_rewrite_sln_one_end_marker_on_same_line(tmp_path):
+    # arrange
+    sln_file = tmp_path / 'test.sln'
+    sln_file.write_bytes(SLN_HEADER
+                         + b'\tGlobalSection(TeamFoundationVersionControl) = preSolution'
+                           b' EndGlobalSection GlobalSection(VersionControl)\r\n'
+                         + SLN_PROPERTIES_SECTION + SLN_FOOTER)
+
+    # act
+    _rewrite_sln_one(str(sln_file))
+
+    # assert
+    assert sln_file.read_bytes() == SLN_HEADER + SLN_PROPERTIES_SECTION + SLN_FOOTER
+
+
+def test_rewrite_sln_one_empty(tmp_path):
+    # arrange
+    sln_file = tmp_path / 'test.sln'
+    sln_file.write_bytes(b'')
+
+    # act
+    _rewrite_sln_one(str(sln_file))
+
+    # assert
+    assert sln_file.read_bytes() == b''
+    assert [p.name for p in tmp_path.iterdir()] == ['test.sln']
+
+
+def test_rewrite_proj_one(tmp_path):
+    # arrange
+    proj_file = tmp_path / 'test.csproj'
+    proj_file.write_bytes(PROJ_HEADER + PROJ_SCC_LINES + PROJ_FOOTER)
+
+    # act
+    _rewrite_proj_one(str(proj_file))
+
+    # assert
+    assert proj_file.read_bytes() == PROJ_HEADER + PROJ_FOOTER
+    assert [p.name for p in tmp_path.iterdir()] == ['test.csproj']
+
+
+def test_rewrite_proj_one_last_line(tmp_path):
+    # arrange
+    proj_file = tmp_path / 'test.csproj'
+    proj_file.write_bytes(PROJ_HEADER + b'    <SccProjectName>SAK</SccProjectName>')
+
+    # act
+    _rewrite_proj_one(str(proj_file))
+
+    # assert
+    assert proj_file.read_bytes() == PROJ_HEADER
+
+
+def test_rewrite_proj_one_no_binding(tmp_path):
+    # arrange
+    proj_file = tmp_path / 'test.csproj'
+    data = PROJ_HEADER + b'    <Description><SccLike /></Description>\r\n' + PROJ_FOOTER
+    proj_file.write_bytes(data)
+
+    # act
+    _rewrite_proj_one(str(proj_file))
+
+    # assert
+    assert proj_file.read_bytes() == data
+
+
+@pytest.mark.parametrize('file_name, data, rewrite', [
+    ('test.sln', SLN_HEADER + SLN_PROPERTIES_SECTION + SLN_FOOTER, _rewrite_sln_one),
+    ('test.csproj', PROJ_HEADER + PROJ_FOOTER, _rewrite_proj_one),
+])
+def test_rewrite_unbound_file_untouched(tmp_path, file_name, data, rewrite):
+    # arrange
+    target = tmp_path / file_name
+    target.write_bytes(data)
+    os.utime(target, ns=(1_000_000_000, 1_000_000_000))
+    before = target.stat()
+
+    # act
+    rewrite(str(target))
+
+    # assert
+    after = target.stat()
+    assert target.read_bytes() == data
+    assert after.st_ino == before.st_ino
+    assert after.st_mtime_ns == before.st_mtime_ns
+    assert [p.name for p in tmp_path.iterdir()] == [file_name]
+
+
+def test_unbind(tmp_path):
+    # arrange
+    orig_dir = tmp_path / 'orig'
+    dest_dir = tmp_path / 'dest'
+
+    sln_data = SLN_HEADER + SLN_VCS_SECTION + SLN_PROPERTIES_SECTION + SLN_FOOTER
+    proj_data = PROJ_HEADER + PROJ_SCC_LINES + PROJ_FOOTER
+    files = {
+        'Test.sln': sln_data,
+        'Test.vssscc': b'',
+        'App/App.csproj': proj_data,
+        'App/App.csproj.user': b'',
+        'App/Program.cs': b'class Program {}',
+        'App/bin/Debug/App.pdb': b'',
+        'App/bin/Debug/sub/Other.sln': sln_data,
+        'App/obj/Release/App.dll': b'',
+        'Lib/Lib.vbproj': proj_data,
+        'Lib/Lib.vspscc': b'',
+        'Lib/Lib.pdb': b'',
+    }
+    for name, data in files.items():
+        path = orig_dir / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(data)
+
+    for name in ('Lib/Lib.vbproj', 'App/obj/Release/App.dll'):
+        os.chmod(orig_dir / name, stat.S_IREAD)
+
+    # act
+    unbind(str(orig_dir), str(dest_dir))
+
+    # assert
+    result = sorted(p.relative_to(dest_dir).as_posix() for p in dest_dir.rglob('*'))
+    assert result == [
+        'App',
+        'App/App.csproj',
+        'App/Program.cs',
+        'App/bin',
+        'App/obj',
+        'Lib',
+        'Lib/Lib.vbproj',
+        'Test.sln',
+    ]
+
+    assert (dest_dir / 'Test.sln').read_bytes() == SLN_HEADER + SLN_PROPERTIES_SECTION + SLN_FOOTER
+    assert (dest_dir / 'App/App.csproj').read_bytes() == PROJ_HEADER + PROJ_FOOTER
+    assert (dest_dir / 'App/Program.cs').read_bytes() == b'class Program {}'
+    assert (dest_dir / 'Lib/Lib.vbproj').read_bytes() == PROJ_HEADER + PROJ_FOOTER
+    assert (dest_dir / 'Lib/Lib.vbproj').stat().st_mode & stat.S_IWRITE
+
+    # 元ディレクトリには変更を加えない
+    assert sorted(p.relative_to(orig_dir).as_posix() for p in orig_dir.rglob('*') if p.is_file()) \
+        == sorted(files)
+    assert (orig_dir / 'Test.sln').read_bytes() == sln_data
@@ -7,7 +7,7 @@ import contextlib as ctx
 import io
 import os
 import sys
-from datetime import datetime
+import time
 from typing import Generator, Optional, IO, Tuple, TextIO, Union
 
 
@@ -15,7 +15,8 @@ from typing import Generator, Optional, IO, Tuple, TextIO, Union
 def open_inout(in_file: str,
                out_file: str,
                in_enc: str = 'utf-8',
-               out_enc: str = 'utf-8') -> Generator[Tuple[IO[str], IO[str]], None, None]:
+               out_enc: str = 'utf-8',
+               buffering: int = 1 << 20) -> Generator[Tuple[IO[str], IO[str]], None, None]:
     """
     指定した２つのファイルを片方は読み込み用、もう片方は書込み用で開きます。
 
@@ -23,6 +24,7 @@ def open_inout(in_file: str,
     :param out_file: 出力用ファイルパス
     :param in_enc: 入力用ファイルのエンコーディング
     :param out_enc: 出力用ファイルのエンコーディング
+    :param buffering: 入出力用ファイルのバッファサイズ (デフォルトは 1MiB)
     :return: 入力用ファイル、出力用ファイルのタプル
     """
     if not in_file or not out_file:
@@ -30,15 +32,13 @@ def open_inout(in_file: str,
     if not in_enc or not out_enc:
         raise ValueError('parameters must be set. [in_enc, out_enc]')
 
-    in_fp = open(in_file, mode='r', encoding=in_enc)
-    out_fp = open(out_file, mode='w', encoding=out_enc)
-    try:
+    # 出力用ファイルを開く際に失敗しても、入力用ファイルは確実に閉じる
+    with ctx.ExitStack() as stack:
+        in_fp = stack.enter_context(open(in_file, mode='r', encoding=in_enc,
+                                         buffering=buffering))
+        out_fp = stack.enter_context(open(out_file, mode='w', encoding=out_enc,
+                                          buffering=buffering))
         yield (in_fp, out_fp)
-    finally:
-        if in_fp:
-            in_fp.close()
-        if out_fp:
-            out_fp.close()
 
 
 @ctx.contextmanager
@@ -49,13 +49,18 @@ def chdir(directory: str = None) -> Generator[str, None, None]:
     :param directory: 一時的にカレントディレクトリにするディレクトリ
     :return: 現在のカレントディレクトリ (yield の結果)
     """
-    if directory is None or not os.path.exists(directory):
+    if directory is None:
         raise ValueError('parameter: directory must be directory-path.')
 
-    _orig_dir = os.path.abspath(os.path.curdir)
+    _orig_dir = os.getcwd()
+    _dest_dir = directory if os.path.isabs(directory) else os.path.abspath(directory)
     try:
         os.chdir(directory)
-        yield os.path.abspath(directory)
+    except FileNotFoundError as e:
+        raise ValueError('parameter: directory must be directory-path.') from e
+
+    try:
+        yield _dest_dir
     finally:
         os.chdir(_orig_dir)
 
@@ -70,13 +75,14 @@ def timetracer(message: Optional[str] = None,
     :param file: 出力先 (デフォルトは sys.stdout)
     :return: なし
     """
-    _start = datetime.now()
+    _start = time.perf_counter_ns()
     try:
         yield
     finally:
-        _diff = datetime.now() - _start
+        _elapsed_ns = time.perf_counter_ns() - _start
         _io = sys.stdout if file is None else file
         _message = 'timetracer' if message is None else message
-        _log = f'[{_message}] elapsed: {_diff.seconds}.{_diff.microseconds} seconds'
+        _sec, _ns = divmod(_elapsed_ns, 1_000_000_000)
+        _log = f'[{_message}] elapsed: {_sec}.{_ns:09d} seconds'
 
         print(_log, file=_io)
@@ -9,18 +9,31 @@ python unbinder.py 元フォルダ 先フォルダ
 https://stackoverflow.com/questions/10028874/getting-unbound-solution-from-tfs
 """
 import argparse
+import collections
 import logging
+import mmap
 import os
+import re
 import shutil
 import stat
-from typing import Tuple, List
+import sys
+from concurrent import futures
+from typing import Callable, Generator, Iterable, List, Tuple
 
-from .libs import chdir, open_inout
+from .libs import chdir
 
 # 不要なディレクトリの名前
 unnecessary_dir_types = ('Debug', 'Release', 'StyleCop')
 # 不要なファイルの拡張子
 unnecessary_file_types = ('.vssscc', '.user', '.vspscc', '.pdb')
+# ファイル操作を並行して行う際のスレッド数
+max_workers = min(32, (os.cpu_count() or 1) * 4)
+# slnファイル内のTFSとのバインディング部分 (GlobalSection の行から EndGlobalSection の行まで)
+vcs_region = re.compile(rb'^[ \t]*GlobalSection[^\n]*?VersionControl'
+                        rb'.*?(?:EndGlobalSection[^\n]*(?:\n|\Z)|\Z)',
+                        re.MULTILINE | re.DOTALL)
+# projファイル内のTFSとのバインディング行
+scc_line = re.compile(rb'^[ \t]*<Scc[^\n]*(?:\n|\Z)', re.MULTILINE)
 
 
 def unbind(orig_dir: str, dest_dir: str) -> None:
@@ -38,20 +51,9 @@ def unbind(orig_dir: str, dest_dir: str) -> None:
     _copytree(orig_dir, dest_dir)
 
     with chdir(dest_dir) as current_dir:
-        # 読み取り専用を解除
-        _make_writeable(current_dir)
-
-        # 処理対象となるディレクトリとファイルを収集
-        del_dirs, del_files, sln_files, proj_files = _collect(current_dir)
-
-        # 不要なディレクトリとファイルを削除
-        _delete(del_dirs, del_files)
-
-        # ソリューションファイルからTFSのバインディングを除去
-        _update_sln(sln_files)
-
-        # projファイルからTFSのバインディングを除去
-        _update_proj(proj_files)
+        # 処理対象となるディレクトリとファイルを収集しながら (読み取り専用の解除も同時に行う)
+        # 不要なディレクトリとファイルの削除、sln/projファイルからのTFSのバインディング除去を行う
+        _process(_collect(current_dir))
 
     logging.warning('完了')
 
@@ -66,126 +68,215 @@ def _copytree(orig_dir: str, dest_dir: str) -> None:
     """
     if not os.path.exists(dest_dir):
         logging.info('ファイルのコピーを開始します・・・・')
+
+        # sendfile 等の高速コピーが使えない場合のバッファサイズを拡大 (Windows の既定値と同じ 1MiB)
+        # 高速コピーを妨げないよう、copy_function は既定 (shutil.copy2) のままにする
+        shutil.COPY_BUFSIZE = max(shutil.COPY_BUFSIZE, 1 << 20)
         shutil.copytree(orig_dir, dest_dir)
 
 
-def _make_writeable(directory: str) -> None:
+def _walk_scandir(directory: str) \
+        -> Generator[Tuple[str, List[os.DirEntry], List[os.DirEntry]], None, None]:
     """
-    読み取り専用を解除します。
+    os.scandir を用いてディレクトリを走査します。
+
+    os.walk と同様に (ディレクトリパス, ディレクトリエントリリスト, ファイルエントリリスト) を返します。
+    呼び出し側でディレクトリエントリリストから要素を除去すると、そのディレクトリ配下は走査しません。
 
     :param directory: 対象ディレクトリ
-    :return: なし
+    :return: タプル(ディレクトリパス、ディレクトリエントリリスト、ファイルエントリリスト) (yield の結果)
     """
-    logging.info('読み取り専用を解除します・・・・')
-    for dirpath, dirnames, filenames in os.walk(directory):
-        for file_name in filenames:
-            full_path = os.path.join(dirpath, file_name)
-            if not os.access(full_path, os.W_OK):
-                os.chmod(full_path, stat.S_IWRITE)
+    pending = collections.deque([directory])
+    while pending:
+        dirpath = pending.popleft()
+        dir_entries = []
+        file_entries = []
+
+        with os.scandir(dirpath) as it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    dir_entries.append(entry)
+                elif entry.is_file(follow_symlinks=False):
+                    file_entries.append(entry)
 
+        yield dirpath, dir_entries, file_entries
 
-def _collect(directory: str) -> Tuple[List[str], List[str], List[str], List[str]]:
+        pending.extend(entry.path for entry in dir_entries)
+
+
+def _collect(directory: str) -> Generator[Tuple[str, str], None, None]:
     """
     処理に必要な情報を収集します。
+    走査と同時に、ファイルの読み取り専用も解除します。
+
+    処理対象は見つかった順に (種別, パス) の形で返します。種別は以下のいずれかです。
+
+    - dir: 削除対象ディレクトリ
+    - file: 削除対象ファイル
+    - sln: ソリューションファイル
+    - proj: プロジェクトファイル
 
     :param directory: 対象ディレクトリ
-    :return: タプル(削除対象ディレクトリリスト、削除対象ファイルリスト、ソリューションファイルリスト、プロジェクトファイルリスト)
+    :return: タプル(種別、パス) (yield の結果)
     """
-    logging.info('処理に必要な情報を収集します・・・・')
+    logging.info('処理に必要な情報の収集と読み取り専用の解除を行います・・・・')
+
+    # 拡張子から種別を引けるようにしておく (proj は *proj 全般が対象なので別途判定)
+    kinds = {file_type.lstrip('.'): 'file' for file_type in unnecessary_file_types}
+    kinds['sln'] = 'sln'
+
+    for _, dir_entries, file_entries in _walk_scandir(directory):
+        # 削除対象のディレクトリは丸ごと削除するので、配下は走査しない
+        walk_entries = []
+        for entry in dir_entries:
+            if entry.name.endswith(unnecessary_dir_types):
+                yield 'dir', entry.path
+            else:
+                walk_entries.append(entry)
+        dir_entries[:] = walk_entries
+
+        for entry in file_entries:
+            # Windows では走査時の情報がそのまま使えるため、stat は追加のシステムコールにならない
+            mode = entry.stat(follow_symlinks=False).st_mode
+            if not mode & stat.S_IWRITE:
+                os.chmod(entry.path, mode | stat.S_IWRITE)
+
+            _, dot, ext = entry.name.rpartition('.')
+            kind = kinds.get(ext) if dot else None
+            if kind is None and ext.endswith('proj'):
+                kind = 'proj'
+
+            if kind is not None:
+                yield kind, entry.path
+
+
+def _process(targets: Iterable[Tuple[str, str]]) -> None:
+    """
+    収集された処理対象を、種別に応じて削除または更新します。
+    処理はスレッドプールで行うため、収集の完了を待たずに順次開始されます。
 
-    del_dirs = []
-    del_files = []
-    sln_files = []
-    proj_files = []
+    :param targets: タプル(種別、パス)のイテラブル
+    :return: なし
+    """
+    logging.info('不要ディレクトリとファイルの削除、sln/projファイルの更新を行います・・・・')
 
-    for dirpath, dirnames, filenames in os.walk(directory):
-        if dirpath.endswith(unnecessary_dir_types):
-            del_dirs.append(dirpath)
-        else:
-            for fname in filenames:
-                if fname.endswith(unnecessary_file_types):
-                    del_files.append(os.path.join(dirpath, fname))
+    actions = {
+        'dir': _rmtree,
+        'file': _unlink,
+        'sln': _rewrite_sln_one,
+        'proj': _rewrite_proj_one,
+    }
 
-                if fname.endswith('.sln'):
-                    sln_files.append(os.path.join(dirpath, fname))
+    with futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        tasks = [executor.submit(actions[kind], path) for kind, path in targets]
 
-                if fname.endswith('proj'):
-                    proj_files.append(os.path.join(dirpath, fname))
+        for task in futures.as_completed(tasks):
+            task.result()
 
-    return del_dirs, del_files, sln_files, proj_files
 
+def _rmtree(directory: str) -> None:
+    """
+    指定されたディレクトリを削除します。
+
+    :param directory: 削除対象ディレクトリ
+    :return: なし
+    """
+    # Python 3.12 以降では onerror は非推奨
+    if sys.version_info >= (3, 12):
+        # pylint: disable=unexpected-keyword-arg
+        shutil.rmtree(directory, onexc=_remove_readonly)
+    else:
+        shutil.rmtree(directory, onerror=lambda func, path, exc_info:
+                      _remove_readonly(func, path, exc_info[1]))
+
+
+def _remove_readonly(func: Callable[[str], None], path: str, exc: BaseException) -> None:
+    """
+    shutil.rmtree のエラーハンドラです。
+    削除対象ディレクトリ配下は読み取り専用を解除していないため、ファイルの削除に失敗した場合は
+    読み取り専用を解除してから再度削除します。それ以外のエラーはそのまま送出します。
 
-def _delete(del_dirs: List[str], del_files: List[str]) -> None:
+    :param func: 失敗した関数
+    :param path: 失敗したパス
+    :param exc: 発生した例外
+    :return: なし
     """
-    指定されたディレクトリとファイルを削除します。
+    if isinstance(exc, FileNotFoundError):
+        return
+    if func not in (os.unlink, os.remove):
+        raise exc
+
+    os.chmod(path, stat.S_IWRITE)
+    try:
+        func(path)
+    except FileNotFoundError:
+        pass
 
-    :param del_dirs: 削除対象ディレクトリリスト
-    :param del_files: 削除対象ファイルリスト
-    :return:
+
+def _unlink(file: str) -> None:
     """
-    logging.info('不要ディレクトリとファイルを削除します・・・・')
-    for del_dir in list(del_dirs):
-        try:
-            shutil.rmtree(del_dir)
-        except FileNotFoundError as e:
-            logging.warning(e)
+    指定されたファイルを削除します。既に存在しない場合は何もしません。
 
-    for file in list(del_files):
-        try:
-            os.unlink(file)
-        except FileNotFoundError as e:
-            logging.warning(e)
+    :param file: 削除対象ファイル
+    :return: なし
+    """
+    try:
+        os.unlink(file)
+    except FileNotFoundError:
+        pass
 
 
-def _update_sln(sln_files: List[str]) -> None:
+def _rewrite_sln_one(sln_file: str) -> None:
     """
-    slnファイルを更新し、TFSとのバインディング部分を除去します。
+    slnファイルを１つ更新し、TFSとのバインディング部分を除去します。
 
-    :param sln_files: ソリューションファイルリスト
+    :param sln_file: ソリューションファイル
     :return: なし
     """
-    logging.info('slnファイルを更新します・・・・')
-    for sln_file in sln_files:
-        sln_file_new = f'{sln_file}.new'
+    sln_file_new = f'{sln_file}.new'
 
-        with open_inout(sln_file, sln_file_new) as (in_fp, out_fp):
-            in_vcs_region = False
-            for line in in_fp:
-                stripped = line.strip()
+    with open(sln_file, 'rb') as in_fp:
+        # 空ファイルは mmap できない (除去する部分も無い)
+        if not os.fstat(in_fp.fileno()).st_size:
+            return
 
-                if stripped.startswith('GlobalSection') and 'VersionControl' in stripped:
-                    in_vcs_region = True
+        with mmap.mmap(in_fp.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            data, modified = vcs_region.subn(b'', mm)
 
-                if not in_vcs_region:
-                    out_fp.write(line)
+    # バインディングが無ければ書き換えない
+    if not modified:
+        return
 
-                if in_vcs_region and 'EndGlobalSection' in stripped:
-                    in_vcs_region = False
+    with open(sln_file_new, 'wb') as out_fp:
+        out_fp.write(data)
 
-        shutil.copystat(sln_file, sln_file_new)
-        shutil.move(sln_file_new, sln_file)
+    shutil.copystat(sln_file, sln_file_new)
+    os.replace(sln_file_new, sln_file)
 
 
-def _update_proj(proj_files: List[str]) -> None:
+def _rewrite_proj_one(proj_file: str) -> None:
     """
-    projファイルを更新し、TFSとのバインディング部分を除去します。
+    projファイルを１つ更新し、TFSとのバインディング部分を除去します。
 
-    :param proj_files: projファイルリスト
+    :param proj_file: projファイル
     :return: なし
     """
-    logging.info('**projファイルを更新します・・・・')
-    for proj_file in proj_files:
-        proj_file_new = f'{proj_file}.new'
+    proj_file_new = f'{proj_file}.new'
+
+    with open(proj_file, 'rb') as in_fp:
+        data = in_fp.read()
+
+    data, modified = scc_line.subn(b'', data)
 
-        with open_inout(proj_file, proj_file_new) as (in_fp, out_fp):
-            for line in in_fp:
-                stripped = line.strip()
+    # バインディングが無ければ書き換えない
+    if not modified:
+        return
 
-                if not stripped.startswith('<Scc'):
-                    out_fp.write(line)
+    with open(proj_file_new, 'wb') as out_fp:
+        out_fp.write(data)
 
-        shutil.copystat(proj_file, proj_file_new)
-        shutil.move(proj_file_new, proj_file)
+    shutil.copystat(proj_file, proj_file_new)
+    os.replace(proj_file_new, proj_file)
 
 
 if __name__ == '__main__':